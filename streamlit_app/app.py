@@ -5,21 +5,29 @@ A production-ready web application for analyzing SEO content quality
 
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from utils import (
     scrape_url,
+    scrape_urls,
     parse_html_content,
     extract_basic_features,
+    extract_basic_features_batch,
     extract_all_features,
-    predict_quality,
+    predict_quality_batch,
     is_thin_content,
-    calculate_composite_score,
-    get_quality_score_interpretation,
     get_score_color,
+    get_score_color_vec,
+    build_results_frame,
+    analyze,
     calculate_similarity
 )
 
+# Maximum number of concurrent URL fetches in batch mode
+MAX_SCRAPE_WORKERS = 16
+
+# Batches with more URLs than this are fetched with the async HTTP/2 client
+ASYNC_SCRAPE_THRESHOLD = 20
+
 # Page configuration
 st.set_page_config(
     page_title="SEO Content Quality Analyzer",
@@ -145,15 +153,13 @@ def single_url_analysis():
             # Extract features
             features = extract_basic_features(result['body_text'])
             
-            # Predict quality
-            quality = predict_quality(features)
-            interpretation = get_quality_score_interpretation(quality, features)
-            
-            # Composite score
-            composite_score = calculate_composite_score(features)
+            # Predict quality and composite score
+            analysis = analyze(features)
             
             # Display results
-            display_analysis_results(result, features, quality, interpretation, composite_score)
+            display_analysis_results(
+                result, features, analysis['quality'], analysis['interpretation'], analysis['score']
+            )
 
 
 def text_input_analysis():
@@ -178,12 +184,8 @@ def text_input_analysis():
             # Extract features
             features = extract_basic_features(text)
             
-            # Predict quality
-            quality = predict_quality(features)
-            interpretation = get_quality_score_interpretation(quality, features)
-            
-            # Composite score
-            composite_score = calculate_composite_score(features)
+            # Predict quality and composite score
+            analysis = analyze(features)
             
             # Display results
             result = {
@@ -193,7 +195,9 @@ def text_input_analysis():
                 'word_count': features['word_count']
             }
             
-            display_analysis_results(result, features, quality, interpretation, composite_score)
+            display_analysis_results(
+                result, features, analysis['quality'], analysis['interpretation'], analysis['score']
+            )
 
 
 def batch_analysis():
@@ -253,8 +257,12 @@ def compare_urls():
     if st.button("🔄 Compare", type="primary"):
         if url1 and url2:
             with st.spinner("Analyzing both URLs..."):
-                result1 = scrape_url(url1)
-                result2 = scrape_url(url2)
+                # Fetch both pages concurrently
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    future1 = executor.submit(scrape_url, url1, include_embedding=True)
+                    future2 = executor.submit(scrape_url, url2, include_embedding=True)
+                    result1 = future1.result()
+                    result2 = future2.result()
                 
                 if result1['status'] == 'error' or result2['status'] == 'error':
                     st.error("❌ Error scraping one or both URLs")
@@ -264,12 +272,16 @@ def compare_urls():
                 features1 = extract_basic_features(result1['body_text'])
                 features2 = extract_basic_features(result2['body_text'])
                 
-                # Predict quality
-                quality1 = predict_quality(features1)
-                quality2 = predict_quality(features2)
+                # Predict quality for both pages in one model call
+                quality1, quality2 = predict_quality_batch([features1, features2])
                 
                 # Calculate similarity
-                similarity = calculate_similarity(result1['body_text'], result2['body_text'])
+                similarity = calculate_similarity(
+                    result1['body_text'],
+                    result2['body_text'],
+                    embedding1=result1['embedding'],
+                    embedding2=result2['embedding']
+                )
                 
                 # Display comparison
                 display_comparison(result1, result2, features1, features2, quality1, quality2, similarity)
@@ -334,6 +346,7 @@ def display_analysis_results(result, features, quality, interpretation, composit
 
 def display_comparison(result1, result2, features1, features2, quality1, quality2, similarity):
     """Display side-by-side comparison"""
+    import plotly.express as px
     
     st.markdown("---")
     
@@ -375,26 +388,20 @@ def display_comparison(result1, result2, features1, features2, quality1, quality
     st.markdown("---")
     st.subheader("📈 Feature Comparison")
     
+    # Build the frame in long form so Plotly does not have to melt it
+    metrics = ['Word Count', 'Sentences', 'Readability', 'Avg Word Length']
+    feature_keys = ['word_count', 'sentence_count', 'flesch_reading_ease', 'avg_word_length']
     comparison_df = pd.DataFrame({
-        'Metric': ['Word Count', 'Sentences', 'Readability', 'Avg Word Length'],
-        'URL 1': [
-            features1['word_count'],
-            features1['sentence_count'],
-            features1['flesch_reading_ease'],
-            features1['avg_word_length']
-        ],
-        'URL 2': [
-            features2['word_count'],
-            features2['sentence_count'],
-            features2['flesch_reading_ease'],
-            features2['avg_word_length']
-        ]
+        'Metric': metrics * 2,
+        'URL': ['URL 1'] * len(metrics) + ['URL 2'] * len(metrics),
+        'Value': [features1[key] for key in feature_keys] + [features2[key] for key in feature_keys]
     })
     
     fig = px.bar(
         comparison_df,
         x='Metric',
-        y=['URL 1', 'URL 2'],
+        y='Value',
+        color='URL',
         barmode='group',
         title="Feature Comparison"
     )
@@ -404,47 +411,72 @@ def display_comparison(result1, result2, features1, features2, quality1, quality
 def process_batch_analysis(df):
     """Process batch analysis"""
     
-    results = []
+    total = len(df)
+    pages = [None] * total  # indexed by row so ordering survives concurrency
     progress_bar = st.progress(0)
     status_text = st.empty()
+    processed = 0
     
-    for idx, row in df.iterrows():
-        status_text.text(f"Processing {idx + 1}/{len(df)}...")
+    # Each progress update is a frontend message; send at most ~100 of them
+    step = max(1, total // 100)
+    
+    def advance():
+        """Update progress after a row has been fetched"""
+        nonlocal processed
         
-        # Get content
-        if 'html_content' in df.columns and pd.notna(row.get('html_content')):
-            title, body_text, word_count = parse_html_content(row['html_content'])
-            url = row['url']
+        processed += 1
+        if processed % step == 0 or processed == total:
+            status_text.text(f"Processing {processed}/{total}...")
+            progress_bar.progress(processed / total)
+    
+    def record(position, scraped):
+        """Store a scraped page and update progress"""
+        if scraped['status'] != 'error':
+            pages[position] = (scraped['url'], scraped['body_text'])
+        advance()
+    
+    # Rows with inline HTML are parsed directly; the rest need scraping
+    row_urls = df['url'].to_numpy()
+    row_htmls = df['html_content'].to_numpy() if 'html_content' in df.columns else [None] * total
+    
+    to_scrape = []
+    for position, (url, html) in enumerate(zip(row_urls, row_htmls)):
+        if html is not None and pd.notna(html):
+            title, body_text, word_count = parse_html_content(html)
+            pages[position] = (url, body_text)
+            advance()
         else:
-            scraped = scrape_url(row['url'])
-            if scraped['status'] == 'error':
-                continue
-            url = scraped['url']
-            body_text = scraped['body_text']
-        
-        # Extract features
-        features = extract_basic_features(body_text)
-        quality = predict_quality(features)
-        composite_score = calculate_composite_score(features)
-        
-        results.append({
-            'URL': url,
-            'Quality': quality,
-            'Score': composite_score,
-            'Word Count': features['word_count'],
-            'Readability': features['flesch_reading_ease'],
-            'Thin Content': is_thin_content(features['word_count'])
-        })
-        
-        progress_bar.progress((idx + 1) / len(df))
+            to_scrape.append((position, url))
+    
+    # Scraping is network-bound, so fetch concurrently
+    if len(to_scrape) > ASYNC_SCRAPE_THRESHOLD:
+        positions = [position for position, _ in to_scrape]
+        scrape_urls(
+            [url for _, url in to_scrape],
+            on_result=lambda i, scraped: record(positions[i], scraped)
+        )
+    elif to_scrape:
+        with ThreadPoolExecutor(max_workers=MAX_SCRAPE_WORKERS) as executor:
+            futures = {
+                executor.submit(scrape_url, url): position
+                for position, url in to_scrape
+            }
+            for future in as_completed(futures):
+                record(futures[future], future.result())
+    
+    # Extract features for all pages in one batch, in input order
+    ordered = [page for page in pages if page is not None]
+    urls = [url for url, _ in ordered]
+    features_df = extract_basic_features_batch([body_text for _, body_text in ordered])
+    
+    # Quality, score and thin-content flags for every page in one pass
+    results_df = build_results_frame(features_df, urls)
     
     status_text.text("Analysis complete!")
     
     # Display results
-    if results:
-        results_df = pd.DataFrame(results)
-        
-        st.success(f"✅ Analyzed {len(results)} pages")
+    if not results_df.empty:
+        st.success(f"✅ Analyzed {len(results_df)} pages")
         
         # Summary stats
         col1, col2, col3, col4 = st.columns(4)
@@ -460,8 +492,12 @@ def process_batch_analysis(df):
             avg_words = results_df['Word Count'].mean()
             st.metric("Avg Words", f"{avg_words:.0f}")
         
-        # Results table
-        st.dataframe(results_df, use_container_width=True)
+        # Results table, with scores colored like the gauge
+        score_colors = [f"color: {color}" for color in get_score_color_vec(results_df['Score'].to_numpy())]
+        st.dataframe(
+            results_df.style.apply(lambda _: score_colors, subset=['Score']),
+            use_container_width=True
+        )
         
         # Download button
         csv = results_df.to_csv(index=False)
@@ -475,6 +511,7 @@ def process_batch_analysis(df):
 
 def create_score_gauge(score):
     """Create a gauge chart for score"""
+    import plotly.graph_objects as go
     
     color = get_score_color(score)
     
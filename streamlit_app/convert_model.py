@@ -0,0 +1,25 @@
+"""
+Model Conversion Script
+Converts the pickled quality model into memory-mappable forest arrays
+
+Run once after retraining (from the streamlit_app directory):
+    python convert_model.py
+"""
+
+import joblib
+from utils.forest import save_quantized_forest
+from utils.scorer import FOREST_PATH, MODEL_PATH, quantize_quality_model
+
+
+def main():
+    """Quantize models/quality_model.pkl and save it to FOREST_PATH"""
+    model = joblib.load(MODEL_PATH)
+    forest = quantize_quality_model(model)
+    save_quantized_forest(forest, FOREST_PATH)
+    
+    n_bytes = sum(array.nbytes for array in forest.values())
+    print(f"Saved {len(model.estimators_)} trees ({n_bytes / 1024:.1f} KB) to {FOREST_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,51 @@
 """Utility package initializer"""
 
-from .parser import parse_html_content, scrape_url
+from .parser import parse_html_content, scrape_url, scrape_urls
 from .features import (
     extract_basic_features,
+    extract_basic_features_batch,
     extract_all_features,
     extract_keywords,
     generate_embeddings,
+    embed_for_storage,
+    quantize_embedding,
     calculate_similarity
 )
 from .scorer import (
     predict_quality,
+    predict_quality_batch,
     is_thin_content,
+    is_thin_content_vec,
     calculate_composite_score,
+    calculate_composite_score_vec,
     get_quality_score_interpretation,
-    get_score_color
+    get_score_color,
+    get_score_color_vec,
+    analyze,
+    build_results_frame
 )
 
 __all__ = [
     'parse_html_content',
     'scrape_url',
+    'scrape_urls',
     'extract_basic_features',
+    'extract_basic_features_batch',
     'extract_all_features',
     'extract_keywords',
     'generate_embeddings',
+    'embed_for_storage',
+    'quantize_embedding',
     'calculate_similarity',
     'predict_quality',
+    'predict_quality_batch',
     'is_thin_content',
+    'is_thin_content_vec',
     'calculate_composite_score',
+    'calculate_composite_score_vec',
     'get_quality_score_interpretation',
-    'get_score_color'
+    'get_score_color',
+    'get_score_color_vec',
+    'analyze',
+    'build_results_frame'
 ]
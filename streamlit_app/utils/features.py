@@ -4,29 +4,128 @@ Extracts NLP and readability features from text
 """
 
 import re
+from collections import Counter
+from functools import lru_cache
 import numpy as np
 import pandas as pd
-import nltk
 import textstat
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sentence_transformers import SentenceTransformer
-from typing import Dict, List, Tuple
+from numba import njit, prange
+from typing import Dict, List, Optional, Tuple
 import streamlit as st
 
 
-# Download NLTK data if not available
-def ensure_nltk_data():
-    """Download required NLTK data"""
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt', quiet=True)
-        nltk.download('punkt_tab', quiet=True)
+# Compute Flesch Reading Ease with textstat, as in training. The compiled
+# vowel-group kernel below counts syllables and sentences differently and
+# can be far off (-1514 vs 86 on one sample page), so only switch this off
+# after retraining the quality model on kernel-computed features.
+USE_TEXTSTAT_FLESCH = True
+
+# Texts with fewer words are not worth scoring for readability
+MIN_WORDS_FOR_ANALYSIS = 10
+
+# Sentence boundaries: a run of terminal punctuation followed by whitespace
+# or end of text. Abbreviations such as "e.g." are not special-cased.
+_SENT_SPLIT = re.compile(r'[.!?]+(?=\s|$)')
+
+
+@njit(cache=True)
+def _count_syllables(buf: np.ndarray) -> int:
+    """
+    Count syllables in lowercase ASCII text with the vowel-group heuristic.
+    
+    Each run of vowels (a, e, i, o, u, y) in a word counts as one syllable,
+    a trailing silent 'e' is dropped, and every word has at least one.
+    
+    Args:
+        buf: Text as a uint8 array of ASCII codes
+        
+    Returns:
+        Total syllable count
+    """
+    total = 0
+    word_syllables = 0
+    in_word = False
+    prev_vowel = False
+    last = 0
+    
+    for i in range(buf.shape[0] + 1):
+        c = buf[i] if i < buf.shape[0] else 32
+        
+        if 97 <= c <= 122:
+            vowel = c == 97 or c == 101 or c == 105 or c == 111 or c == 117 or c == 121
+            if vowel and not prev_vowel:
+                word_syllables += 1
+            prev_vowel = vowel
+            in_word = True
+            last = c
+        elif c == 39 and in_word:
+            # Apostrophes stay inside the word (don't, it's)
+            prev_vowel = False
+        elif in_word:
+            if last == 101 and word_syllables > 1:
+                word_syllables -= 1
+            total += max(word_syllables, 1)
+            word_syllables = 0
+            in_word = False
+            prev_vowel = False
+    
+    return total
+
+
+@njit(cache=True)
+def _flesch(words: float, sentences: float, syllables: float) -> float:
+    """Flesch Reading Ease from precomputed counts"""
+    return 206.835 - 1.015 * (words / sentences) - 84.6 * (syllables / words)
+
+
+@njit(parallel=True, cache=True)
+def _count_syllables_batch(buf: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Count syllables for many documents packed into one buffer.
+    
+    Args:
+        buf: Concatenated ASCII codes of all documents
+        offsets: Document boundaries in buf (length n_docs + 1)
+        
+    Returns:
+        Syllable count per document
+    """
+    n_docs = offsets.shape[0] - 1
+    counts = np.empty(n_docs, dtype=np.int64)
+    for i in prange(n_docs):
+        counts[i] = _count_syllables(buf[offsets[i]:offsets[i + 1]])
+    return counts
+
+
+def flesch_reading_ease(text: str, word_count: int, sentence_count: int) -> float:
+    """
+    Compute Flesch Reading Ease with textstat, or with the compiled syllable
+    counter when USE_TEXTSTAT_FLESCH is off.
+    
+    Args:
+        text: Cleaned (lowercase) text
+        word_count: Number of words in text
+        sentence_count: Number of sentences in text
+        
+    Returns:
+        Flesch Reading Ease score, rounded to 2 decimals like textstat
+    """
+    if USE_TEXTSTAT_FLESCH:
+        return textstat.flesch_reading_ease(text)
+    if not word_count or not sentence_count:
+        return 0.0
+    
+    buf = np.frombuffer(text.encode('ascii', 'ignore'), dtype=np.uint8)
+    syllables = _count_syllables(buf)
+    return float(np.round(_flesch(word_count, sentence_count, syllables), 2))
 
 
 @st.cache_resource
 def load_embedding_model():
     """Load and cache the sentence transformer model"""
+    # Imported lazily: torch + transformers add seconds to app cold start
+    from sentence_transformers import SentenceTransformer
+    
     return SentenceTransformer('all-MiniLM-L6-v2')
 
 
@@ -40,35 +139,48 @@ def clean_text(text: str) -> str:
     Returns:
         Cleaned text (lowercase, normalized whitespace)
     """
-    text = str(text).lower()
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    return ' '.join(str(text).lower().split())
 
 
+@st.cache_data(max_entries=512, show_spinner=False)
 def extract_basic_features(text: str) -> Dict[str, any]:
     """
     Extract basic text features: word count, sentence count, readability.
     
+    Sentences are counted with a punctuation regex rather than a trained
+    tokenizer. This is much faster but does not special-case abbreviations
+    ("e.g.", "Dr."), which can inflate the count slightly.
+    
+    Texts shorter than MIN_WORDS_FOR_ANALYSIS words (failed scrapes, error
+    pages) skip sentence counting and readability scoring.
+    
     Args:
         text: Input text
         
     Returns:
         Dictionary with basic features
     """
-    ensure_nltk_data()
-    
     clean = clean_text(text)
     
-    # Basic counts
-    word_count = len(clean.split())
-    sentence_count = len(nltk.sent_tokenize(clean)) if clean else 0
-    
-    # Readability
-    flesch_score = textstat.flesch_reading_ease(clean) if clean else 0
+    # Basic counts (tokenize words once and reuse)
+    words = clean.split()
+    word_count = len(words)
     
     # Average word length
-    words = clean.split()
-    avg_word_length = np.mean([len(w) for w in words]) if words else 0
+    avg_word_length = (sum(map(len, words)) / word_count) if word_count else 0.0
+    
+    if word_count < MIN_WORDS_FOR_ANALYSIS:
+        return {
+            'word_count': word_count,
+            'sentence_count': max(1, clean.count('.')) if clean else 0,
+            'flesch_reading_ease': 0.0,
+            'avg_word_length': float(avg_word_length)
+        }
+    
+    sentence_count = len(_SENT_SPLIT.findall(clean)) or 1
+    
+    # Readability
+    flesch_score = flesch_reading_ease(clean, word_count, sentence_count)
     
     return {
         'word_count': word_count,
@@ -78,10 +190,106 @@ def extract_basic_features(text: str) -> Dict[str, any]:
     }
 
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def extract_basic_features_batch(texts: List[str]) -> pd.DataFrame:
+    """
+    Extract basic features for many documents at once.
+    
+    Produces the same values as extract_basic_features, but counts are
+    computed column-wise and syllables for all documents are counted in a
+    single parallel pass.
+    
+    Args:
+        texts: List of text documents
+        
+    Returns:
+        DataFrame with word_count, sentence_count, flesch_reading_ease and
+        avg_word_length columns, one row per document
+    """
+    clean = pd.Series([clean_text(t) for t in texts], dtype=object)
+    
+    # Basic counts (clean text is single-space separated)
+    word_count = clean.str.split().str.len().to_numpy(dtype=np.int64)
+    char_count = clean.str.len().to_numpy(dtype=np.int64)
+    short = word_count < MIN_WORDS_FOR_ANALYSIS
+    sentence_count = np.where(
+        short,
+        np.where(char_count > 0, np.maximum(clean.str.count(r'\.').to_numpy(dtype=np.int64), 1), 0),
+        np.maximum(clean.str.count(_SENT_SPLIT.pattern).to_numpy(dtype=np.int64), 1)
+    )
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Average word length: letters are all characters minus separators
+        avg_word_length = np.where(
+            word_count > 0,
+            (char_count - (word_count - 1)) / word_count,
+            0.0
+        )
+        
+        # Readability
+        if USE_TEXTSTAT_FLESCH:
+            flesch = np.array([
+                0.0 if is_short else textstat.flesch_reading_ease(c)
+                for c, is_short in zip(clean, short)
+            ], dtype=np.float64)
+        else:
+            encoded = [c.encode('ascii', 'ignore') for c in clean]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+            buf = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+            syllables = _count_syllables_batch(buf, offsets)
+            
+            flesch = 206.835 - 1.015 * (word_count / sentence_count) - 84.6 * (syllables / word_count)
+            flesch = np.where(~short & (sentence_count > 0), np.round(flesch, 2), 0.0)
+    
+    return pd.DataFrame({
+        'word_count': word_count,
+        'sentence_count': sentence_count,
+        'flesch_reading_ease': flesch,
+        'avg_word_length': avg_word_length
+    })
+
+
+# Same token pattern TfidfVectorizer uses by default
+_TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')
+
+@lru_cache(maxsize=1)
+def _get_stop_words() -> frozenset:
+    """Load sklearn's English stop words once"""
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+    
+    return frozenset(ENGLISH_STOP_WORDS)
+
+
+@lru_cache(maxsize=1)
+def _get_stop_word_list() -> List[str]:
+    """Stop words in the list form TfidfVectorizer expects, built once"""
+    return sorted(_get_stop_words())
+
+
+def _extract_keywords_single(text: str, top_n: int) -> str:
+    """
+    Top keywords of a single document by term frequency.
+    
+    With one document every term has the same IDF, so TF-IDF ranking
+    reduces to counting non-stop-word tokens.
+    """
+    stop_words = _get_stop_words()
+    counts = Counter(
+        token for token in _TOKEN_PATTERN.findall(clean_text(text))
+        if token not in stop_words
+    )
+    return "|".join(token for token, _ in counts.most_common(top_n))
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
 def extract_keywords(texts: List[str], top_n: int = 5) -> List[str]:
     """
     Extract top keywords using TF-IDF.
     
+    A single document is ranked by term frequency instead, which gives
+    the same ordering without fitting a vectorizer.
+    
     Args:
         texts: List of text documents
         top_n: Number of top keywords to extract
@@ -92,12 +300,19 @@ def extract_keywords(texts: List[str], top_n: int = 5) -> List[str]:
     if not texts or all(not t for t in texts):
         return [''] * len(texts)
     
+    # Single document: TF-IDF is meaningless, skip the vectorizer entirely
+    if len(texts) == 1:
+        return [_extract_keywords_single(texts[0], top_n)]
+    
     # Clean texts
     clean_texts = [clean_text(t) if t else '' for t in texts]
     
-    # TF-IDF
+    # TF-IDF: a fresh vectorizer per call, so concurrent sessions never
+    # share fitted state; only the stop-word list is reused
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    
     vectorizer = TfidfVectorizer(
-        stop_words='english',
+        stop_words=_get_stop_word_list(),
         max_features=1000,
         min_df=min(2, len(texts))  # Adjust for small datasets
     )
@@ -107,12 +322,20 @@ def extract_keywords(texts: List[str], top_n: int = 5) -> List[str]:
         feature_names = vectorizer.get_feature_names_out()
         
         keywords_list = []
-        dense_matrix = tfidf_matrix.toarray()
         
-        for doc_vector in dense_matrix:
-            sorted_indices = doc_vector.argsort()[-top_n:][::-1]
-            keywords = [feature_names[i] for i in sorted_indices if doc_vector[i] > 0]
-            keywords_list.append("|".join(keywords))
+        # Walk the sparse rows directly: only non-zero terms are considered,
+        # and argpartition selects the top terms without a full sort
+        for i in range(tfidf_matrix.shape[0]):
+            row = tfidf_matrix.getrow(i)
+            scores, term_indices = row.data, row.indices
+            if scores.size == 0:
+                keywords_list.append('')
+                continue
+            
+            k = min(top_n, scores.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            keywords_list.append("|".join(feature_names[term_indices[top]]))
         
         return keywords_list
     except Exception as e:
@@ -120,22 +343,72 @@ def extract_keywords(texts: List[str], top_n: int = 5) -> List[str]:
         return [''] * len(texts)
 
 
-def generate_embeddings(texts: List[str]) -> np.ndarray:
+@st.cache_data(max_entries=512, show_spinner=False, hash_funcs={list: lambda l: tuple(l)})
+def generate_embeddings(texts: List[str], normalize: bool = False) -> np.ndarray:
     """
     Generate sentence embeddings using transformer model.
     
     Args:
         texts: List of text documents
+        normalize: Whether to L2-normalize each embedding
         
     Returns:
         Numpy array of embeddings (n_docs x 384)
     """
     model = load_embedding_model()
     clean_texts = [clean_text(t) if t else '' for t in texts]
-    embeddings = model.encode(clean_texts, show_progress_bar=False)
+    embeddings = model.encode(
+        clean_texts,
+        batch_size=32,
+        normalize_embeddings=normalize,
+        show_progress_bar=False
+    )
     return embeddings
 
 
+# Normalized embedding components lie in [-1, 1] and are stored as int8
+_INT8_SCALE = 127
+
+
+def quantize_embedding(embedding: np.ndarray) -> np.ndarray:
+    """
+    Quantize a normalized embedding to int8.
+    
+    Args:
+        embedding: L2-normalized float embedding
+        
+    Returns:
+        int8 embedding scaled by 127
+    """
+    return np.clip(np.round(embedding * _INT8_SCALE), -128, 127).astype(np.int8)
+
+
+def embed_for_storage(text: str) -> np.ndarray:
+    """
+    Compute a normalized embedding compact enough to keep with a document.
+    
+    Stored as int8 (384 bytes per document instead of 1.5 KB for float32)
+    so it can travel in scrape results and be reused by
+    calculate_similarity. Quantization changes cosine similarity by well
+    under 1%.
+    
+    Args:
+        text: Input text
+        
+    Returns:
+        L2-normalized int8-quantized embedding (384,)
+    """
+    return quantize_embedding(generate_embeddings([text], normalize=True)[0])
+
+
+def _as_float_embedding(embedding: np.ndarray) -> np.ndarray:
+    """Return a float32 view of a float or int8-quantized embedding"""
+    embedding = np.asarray(embedding)
+    if embedding.dtype == np.int8:
+        return embedding.astype(np.float32) / _INT8_SCALE
+    return embedding.astype(np.float32, copy=False)
+
+
 def extract_all_features(text: str, include_embeddings: bool = False) -> Dict[str, any]:
     """
     Extract all features from a single text document.
@@ -161,19 +434,47 @@ def extract_all_features(text: str, include_embeddings: bool = False) -> Dict[st
     return features
 
 
-def calculate_similarity(text1: str, text2: str) -> float:
+@st.cache_data(max_entries=512, show_spinner=False)
+def calculate_similarity(
+    text1: str,
+    text2: str,
+    embedding1: Optional[np.ndarray] = None,
+    embedding2: Optional[np.ndarray] = None
+) -> float:
     """
     Calculate cosine similarity between two texts using embeddings.
     
+    Embeddings are L2-normalized, so the cosine similarity reduces to a
+    plain dot product. Precomputed normalized embeddings (float or int8
+    from scrape_url(..., include_embedding=True)) skip re-encoding; any
+    missing ones are encoded together in one pass.
+    
     Args:
         text1: First text
         text2: Second text
+        embedding1: Optional precomputed normalized (or int8) embedding of text1
+        embedding2: Optional precomputed normalized (or int8) embedding of text2
         
     Returns:
         Similarity score (0-1)
     """
-    from sklearn.metrics.pairwise import cosine_similarity
+    missing = [
+        text for text, embedding in ((text1, embedding1), (text2, embedding2))
+        if embedding is None
+    ]
+    if missing:
+        encoded = iter(generate_embeddings(missing, normalize=True))
+        if embedding1 is None:
+            embedding1 = next(encoded)
+        if embedding2 is None:
+            embedding2 = next(encoded)
+    
+    embedding1 = np.asarray(embedding1)
+    embedding2 = np.asarray(embedding2)
+    
+    # Both quantized: integer dot product (widened so it cannot overflow)
+    if embedding1.dtype == np.int8 and embedding2.dtype == np.int8:
+        dot = int(embedding1.astype(np.int32) @ embedding2.astype(np.int32))
+        return max(-1.0, min(dot / (_INT8_SCALE * _INT8_SCALE), 1.0))
     
-    embeddings = generate_embeddings([text1, text2])
-    similarity = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
-    return float(similarity)
+    return float(_as_float_embedding(embedding1) @ _as_float_embedding(embedding2))
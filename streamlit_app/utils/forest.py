@@ -0,0 +1,350 @@
+"""
+Random Forest Inference Module
+Quantized, Numba-compiled and generated-C inference for the quality model
+"""
+
+import ctypes
+import os
+import subprocess
+import threading
+import numpy as np
+from numba import njit, prange
+from pathlib import Path
+from typing import Callable, Dict
+
+
+# Numba's fallback "workqueue" threading layer must not be entered from two
+# threads at once, so parallel kernel launches are serialized
+_PARALLEL_LOCK = threading.Lock()
+
+
+def quantize_forest(model) -> Dict[str, np.ndarray]:
+    """
+    Flatten a fitted RandomForestClassifier into quantized node arrays.
+    
+    Thresholds are replaced by their rank among all thresholds the forest
+    uses for that feature, and inputs are binned against the same sorted
+    thresholds at predict time. Because "x <= threshold" is equivalent to
+    "rank(x) <= rank(threshold)", the quantization is lossless: predictions
+    match sklearn exactly while node arrays shrink to uint8 (uint16 if a
+    feature has more than 255 distinct thresholds). Child indices use int16
+    when the forest is small enough and leaf probabilities are stored as
+    float32; impurity and sample counts, which prediction never reads, are
+    dropped.
+    
+    Args:
+        model: Fitted sklearn RandomForestClassifier
+    
+    Returns:
+        Dictionary of NumPy arrays (structure of arrays over all nodes):
+            - bin_edges: Sorted thresholds per feature, +inf padded
+            - n_edges: Number of real thresholds per feature
+            - features: Feature index per node
+            - thresholds: Threshold rank per node
+            - left, right: Child node indices (-1 for leaves)
+            - roots: Root node index of each tree
+            - leaf_values: Class probabilities per node (used at leaves)
+            - classes: Class labels
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    n_features = model.n_features_in_
+    
+    # Sorted distinct thresholds per feature across the whole forest
+    edges = []
+    for f in range(n_features):
+        per_tree = [t.threshold[(t.children_left != -1) & (t.feature == f)] for t in trees]
+        edges.append(np.unique(np.concatenate(per_tree)))
+    
+    max_edges = max(1, max(len(e) for e in edges))
+    code_dtype = np.uint8 if max_edges <= np.iinfo(np.uint8).max else np.uint16
+    
+    bin_edges = np.full((n_features, max_edges), np.inf)
+    for f, e in enumerate(edges):
+        bin_edges[f, :len(e)] = e
+    
+    features, thresholds, left, right, leaf_values, roots = [], [], [], [], [], []
+    offset = 0
+    
+    for t in trees:
+        is_leaf = t.children_left == -1
+        feature = np.where(is_leaf, 0, t.feature)
+        
+        rank = np.zeros(t.node_count, dtype=np.int64)
+        for f in range(n_features):
+            mask = ~is_leaf & (feature == f)
+            rank[mask] = np.searchsorted(edges[f], t.threshold[mask])
+        
+        # Normalize leaf values to probabilities (older sklearn stores counts)
+        values = t.value[:, 0, :]
+        values = values / values.sum(axis=1, keepdims=True)
+        
+        features.append(feature)
+        thresholds.append(rank)
+        left.append(np.where(is_leaf, -1, t.children_left + offset))
+        right.append(np.where(is_leaf, -1, t.children_right + offset))
+        leaf_values.append(values)
+        roots.append(offset)
+        offset += t.node_count
+    
+    # Smallest signed type that can hold every node index
+    index_dtype = np.int16 if offset <= np.iinfo(np.int16).max else np.int32
+    
+    return {
+        'bin_edges': bin_edges,
+        'n_edges': np.array([len(e) for e in edges], dtype=np.int64),
+        'features': np.concatenate(features).astype(np.uint8),
+        'thresholds': np.concatenate(thresholds).astype(code_dtype),
+        'left': np.concatenate(left).astype(index_dtype),
+        'right': np.concatenate(right).astype(index_dtype),
+        'roots': np.array(roots, dtype=index_dtype),
+        # float32 is plenty for per-leaf probabilities; votes are summed in float64
+        'leaf_values': np.concatenate(leaf_values).astype(np.float32),
+        'classes': np.asarray(model.classes_).astype(str)
+    }
+
+
+def save_quantized_forest(forest: Dict[str, np.ndarray], path: Path) -> None:
+    """
+    Save quantized forest arrays as one .npy file each under a directory.
+    
+    Plain .npy files (unlike .npz archives) can be memory-mapped on load.
+    Each file is written under a temporary name and swapped in, so processes
+    that already have the old file mapped keep reading consistent data.
+    
+    Args:
+        forest: Quantized forest from quantize_forest
+        path: Directory to write to (created if missing)
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    for name, array in forest.items():
+        target = path / f"{name}.npy"
+        tmp_path = path / f"{name}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, array)
+        os.replace(tmp_path, target)
+
+
+def load_quantized_forest(path: Path) -> Dict[str, np.ndarray]:
+    """Memory-map (read-only) the quantized forest arrays saved by save_quantized_forest"""
+    return {
+        file.name[:-len('.npy')]: np.load(file, mmap_mode='r')
+        for file in path.glob('*.npy')
+        if '.tmp.' not in file.name
+    }
+
+
+def bin_features(X: np.ndarray, forest: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Map raw feature values to threshold ranks.
+    
+    Args:
+        X: Float input of shape (n, n_features)
+        forest: Quantized forest from quantize_forest
+    
+    Returns:
+        Integer codes of shape (n, n_features), same dtype as thresholds
+    """
+    bin_edges, n_edges = forest['bin_edges'], forest['n_edges']
+    codes = np.empty(X.shape, dtype=forest['thresholds'].dtype)
+    for f in range(X.shape[1]):
+        # Number of thresholds strictly below x: x <= t_k  <=>  code <= k
+        codes[:, f] = np.searchsorted(bin_edges[f, :n_edges[f]], X[:, f], side='left')
+    return codes
+
+
+@njit(cache=True)
+def _predict_binned(codes, features, thresholds, left, right, roots, leaf_values):
+    """Walk every tree for every sample and return the soft-vote class index"""
+    n_samples = codes.shape[0]
+    n_classes = leaf_values.shape[1]
+    predictions = np.empty(n_samples, dtype=np.int64)
+    totals = np.empty(n_classes, dtype=np.float64)
+    
+    for i in range(n_samples):
+        totals[:] = 0.0
+        for root in roots:
+            node = root
+            while left[node] != -1:
+                if codes[i, features[node]] <= thresholds[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            for c in range(n_classes):
+                totals[c] += leaf_values[node, c]
+        predictions[i] = np.argmax(totals)
+    
+    return predictions
+
+
+@njit(parallel=True, cache=True)
+def _predict_binned_parallel(codes, features, thresholds, left, right, roots, leaf_values):
+    """_predict_binned with samples spread across cores"""
+    n_samples = codes.shape[0]
+    n_classes = leaf_values.shape[1]
+    predictions = np.empty(n_samples, dtype=np.int64)
+    
+    for i in prange(n_samples):
+        totals = np.zeros(n_classes, dtype=np.float64)
+        for root in roots:
+            node = root
+            while left[node] != -1:
+                if codes[i, features[node]] <= thresholds[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            for c in range(n_classes):
+                totals[c] += leaf_values[node, c]
+        predictions[i] = np.argmax(totals)
+    
+    return predictions
+
+
+def predict_quantized(forest: Dict[str, np.ndarray], X: np.ndarray, parallel: bool = False) -> np.ndarray:
+    """
+    Predict class labels with the quantized forest.
+    
+    Args:
+        forest: Quantized forest from quantize_forest
+        X: Float input of shape (n, n_features)
+        parallel: Spread samples across cores (worth it for large batches only)
+    
+    Returns:
+        Array of class labels
+    """
+    # Trees compare in float32; bin in the same precision so ties match
+    codes = bin_features(np.asarray(X, dtype=np.float32), forest)
+    arrays = (
+        codes,
+        forest['features'],
+        forest['thresholds'],
+        forest['left'],
+        forest['right'],
+        forest['roots'],
+        forest['leaf_values']
+    )
+    
+    if parallel:
+        with _PARALLEL_LOCK:
+            indices = _predict_binned_parallel(*arrays)
+    else:
+        indices = _predict_binned(*arrays)
+    
+    return forest['classes'][indices]
+
+
+def generate_forest_source(forest: Dict[str, np.ndarray]) -> str:
+    """
+    Generate C source that hard-codes the forest as one function per tree.
+    
+    Each tree becomes a nested ternary over its thresholds that returns the
+    index of the leaf reached, so there is no node array to index and no
+    feature dispatch at run time. predict_forest() sums the leaves' class
+    probabilities over all trees (soft vote, like sklearn) and writes the
+    argmax class index per sample.
+    
+    Args:
+        forest: Quantized forest from quantize_forest
+    
+    Returns:
+        C source exporting
+        void predict_forest(const float *x, long n_samples, int *out)
+    """
+    bin_edges = forest['bin_edges']
+    features, thresholds = forest['features'], forest['thresholds']
+    left, right = forest['left'], forest['right']
+    leaf_values = forest['leaf_values']
+    n_features = bin_edges.shape[0]
+    n_classes = leaf_values.shape[1]
+    
+    def node_expr(node: int) -> str:
+        if left[node] == -1:
+            return str(node)
+        f = int(features[node])
+        # sklearn compares the float32 input against a float64 threshold;
+        # repr() of the double reproduces it exactly
+        threshold = repr(float(bin_edges[f, thresholds[node]]))
+        return f"(x[{f}] <= {threshold} ? {node_expr(int(left[node]))} : {node_expr(int(right[node]))})"
+    
+    lines = [f"#define N_FEATURES {n_features}", f"#define N_CLASSES {n_classes}", ""]
+    
+    rows = ", ".join(
+        "{" + ", ".join(repr(float(v)) for v in row) + "}" for row in leaf_values
+    )
+    lines.append(f"static const double LEAF_VALUES[][N_CLASSES] = {{{rows}}};")
+    lines.append("")
+    
+    for i, root in enumerate(forest['roots']):
+        lines.append(f"static int tree_{i}(const float *x) {{ return {node_expr(int(root))}; }}")
+    
+    n_trees = len(forest['roots'])
+    lines.append("")
+    lines.append("static int (*const TREES[])(const float *) = {" + ", ".join(f"tree_{i}" for i in range(n_trees)) + "};")
+    lines.append(f"""
+void predict_forest(const float *x, long n_samples, int *out) {{
+    for (long i = 0; i < n_samples; i++) {{
+        const float *row = x + i * N_FEATURES;
+        double totals[N_CLASSES] = {{0}};
+        for (int t = 0; t < {n_trees}; t++) {{
+            const double *leaf = LEAF_VALUES[TREES[t](row)];
+            for (int c = 0; c < N_CLASSES; c++) totals[c] += leaf[c];
+        }}
+        /* First maximum wins, like np.argmax */
+        int best = 0;
+        for (int c = 1; c < N_CLASSES; c++) if (totals[c] > totals[best]) best = c;
+        out[i] = best;
+    }}
+}}""")
+    
+    return "\n".join(lines) + "\n"
+
+
+def compile_forest_library(source: str, libpath: Path) -> None:
+    """
+    Compile source from generate_forest_source into a shared library.
+    
+    The library is built under a unique name and moved into place, so
+    concurrent processes never load a half-written file.
+    
+    Args:
+        source: C source of the forest
+        libpath: Destination .so path
+    
+    Raises:
+        OSError or subprocess.CalledProcessError if no C compiler is usable
+    """
+    tmp_path = libpath.with_suffix(f".{os.getpid()}.tmp.so")
+    
+    try:
+        subprocess.run(
+            [os.environ.get('CC', 'cc'), '-O2', '-shared', '-fPIC', '-x', 'c', '-o', str(tmp_path), '-'],
+            input=source.encode(),
+            check=True,
+            capture_output=True
+        )
+        os.replace(tmp_path, libpath)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_forest_library(forest: Dict[str, np.ndarray], libpath: Path) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Load a library built by compile_forest_library as a predictor.
+    
+    Args:
+        forest: Quantized forest the library was generated from (for labels)
+        libpath: Path of the compiled .so
+    
+    Returns:
+        Function mapping a float (n, n_features) array to class labels
+    """
+    predict_forest = ctypes.CDLL(str(libpath)).predict_forest
+    predict_forest.argtypes = [ctypes.c_void_p, ctypes.c_long, ctypes.c_void_p]
+    predict_forest.restype = None
+    classes = forest['classes']
+    
+    def predict(X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        indices = np.empty(len(X), dtype=np.intc)
+        predict_forest(X.ctypes.data, len(X), indices.ctypes.data)
+        return classes[indices]
+    
+    return predict
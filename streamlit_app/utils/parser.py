@@ -3,17 +3,65 @@ HTML Content Parsing Module
 Extracts clean text, titles, and body content from HTML
 """
 
-from bs4 import BeautifulSoup
-import re
+import asyncio
+import threading
+from selectolax.lexbor import LexborHTMLParser
+import httpx
 import requests
-from typing import Tuple, Dict
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .features import embed_for_storage
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+
+_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+# Retries for connection and read errors (blocking and async scrapes alike)
+_RETRIES = 2
+_RETRY_BACKOFF = 0.3
+
+# Async errors worth retrying; anything else (bad scheme, invalid URL) fails
+# the same way on every attempt
+_RETRYABLE_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+# Pages fetched by scrape_urls, handed to _fetch_page on this thread so
+# the results go through (and into) the same cache as scrape_url
+_PREFETCHED = threading.local()
+
+
+class _NotCached(Exception):
+    """Raised by _fetch_page when probing the cache for a page not in it"""
+
+
+def _create_session() -> requests.Session:
+    """Create a pooled HTTP session shared by all scrape requests"""
+    session = requests.Session()
+    session.headers.update(_HEADERS)
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        max_retries=Retry(total=_RETRIES, backoff_factor=_RETRY_BACKOFF)
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# Keep-alive connections are reused across calls (and threads) for GET requests
+_SESSION = _create_session()
 
 
 def parse_html_content(html: str) -> Tuple[str, str, int]:
     """
     Parses raw HTML to extract title and clean main body text.
     
-    Prioritizes <main> and <article> tags, then falls back to <body>.
+    Uses selectolax (Lexbor C parser). Scripts, styles and page chrome
+    (nav, footer, aside) are stripped, then <main> and <article> tags are
+    prioritized before falling back to <body>.
     
     Args:
         html: Raw HTML string
@@ -22,30 +70,27 @@ def parse_html_content(html: str) -> Tuple[str, str, int]:
         Tuple of (title, body_text, word_count)
     """
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = LexborHTMLParser(html)
         
         # 1. Extract Title
-        title = soup.title.string.strip() if soup.title else ''
+        title_node = tree.css_first('title')
+        title = title_node.text(strip=True) if title_node else ''
         
-        # 2. Extract Main Content
-        main_content = soup.find('main')
-        if not main_content:
-            main_content = soup.find('article')
-        if not main_content:
-            main_content = soup.find('body')
+        # 2. Drop non-content elements in a single pass
+        for node in tree.css('script, style, noscript, nav, footer, aside'):
+            node.decompose()
+        
+        # 3. Extract Main Content
+        main_content = tree.css_first('main') or tree.css_first('article') or tree.css_first('body')
         
         if main_content:
-            # Remove script and style tags
-            for tag in main_content(['script', 'style']):
-                tag.decompose()
-            
             # Get clean text
-            body_text = main_content.get_text(separator=' ', strip=True)
-            body_text = re.sub(r'\s+', ' ', body_text)
+            body_text = main_content.text(separator=' ', strip=True)
+            body_text = ' '.join(body_text.split())
         else:
             body_text = ''
             
-        # 3. Calculate Word Count
+        # 4. Calculate Word Count
         word_count = len(body_text.split())
         
         return title, body_text, word_count
@@ -55,34 +100,29 @@ def parse_html_content(html: str) -> Tuple[str, str, int]:
         return '', '', 0
 
 
-def scrape_url(url: str, timeout: int = 10) -> Dict[str, any]:
+def scrape_url(url: str, timeout: int = 10, include_embedding: bool = False) -> Dict[str, any]:
     """
     Scrapes a URL and extracts content.
     
+    Successful results are cached for an hour so repeated analyses of the
+    same URL skip the network. Failures are not cached, so a transient
+    timeout or server error can be retried right away.
+    
     Args:
         url: URL to scrape
         timeout: Request timeout in seconds
+        include_embedding: Also store the normalized int8 embedding of
+            the body text under 'embedding'
         
     Returns:
-        Dictionary with url, title, body_text, word_count, or error
+        Dictionary with url, title, body_text, word_count (and embedding),
+        or error
     """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=timeout, headers=headers)
-        response.raise_for_status()
-        
-        title, body_text, word_count = parse_html_content(response.text)
-        
-        return {
-            'url': url,
-            'title': title,
-            'body_text': body_text,
-            'word_count': word_count,
-            'status': 'success'
-        }
-    except requests.exceptions.RequestException as e:
+        return _fetch_page(url, timeout, include_embedding)
+    except _NotCached:
+        raise
+    except (requests.exceptions.RequestException, httpx.HTTPError, httpx.InvalidURL) as e:
         return {
             'url': url,
             'error': str(e),
@@ -94,3 +134,153 @@ def scrape_url(url: str, timeout: int = 10) -> Dict[str, any]:
             'error': f"Parsing error: {str(e)}",
             'status': 'error'
         }
+
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def _fetch_page(url: str, timeout: int = 10, include_embedding: bool = False) -> Dict[str, any]:
+    """
+    Scrapes a URL and extracts content, raising on failure.
+    
+    Streamlit does not cache exceptions, so only successful scrapes are
+    memoized; scrape_url turns errors into result dictionaries. While
+    scrape_urls has pages prefetched on this thread, those are used
+    instead of the network (and a missing page raises _NotCached).
+    
+    Args:
+        url: URL to scrape
+        timeout: Request timeout in seconds
+        include_embedding: Also store the body text embedding
+        
+    Returns:
+        Dictionary with url, title, body_text, word_count (and embedding)
+    """
+    prefetched = getattr(_PREFETCHED, 'pages', None)
+    
+    if prefetched is None:
+        response = _SESSION.get(url, timeout=timeout)
+        response.raise_for_status()
+        html = response.text
+    elif url not in prefetched:
+        raise _NotCached(url)
+    elif isinstance(prefetched[url], Exception):
+        raise prefetched[url]
+    else:
+        html = prefetched[url]
+    
+    title, body_text, word_count = parse_html_content(html)
+    
+    result = {
+        'url': url,
+        'title': title,
+        'body_text': body_text,
+        'word_count': word_count,
+        'status': 'success'
+    }
+    if include_embedding:
+        result['embedding'] = embed_for_storage(body_text)
+    
+    return result
+
+
+def _scrape_prefetched(url: str, page: Union[str, Exception], timeout: int) -> Dict[str, any]:
+    """Parse a page fetched by scrape_urls through the scrape_url cache"""
+    _PREFETCHED.pages = {url: page}
+    try:
+        return scrape_url(url, timeout)
+    finally:
+        _PREFETCHED.pages = None
+
+
+async def _fetch_html(client: httpx.AsyncClient, url: str) -> Union[str, Exception]:
+    """
+    Fetch one URL with the async client, retrying connection and read
+    errors like the blocking session does. Returns the HTML or the error,
+    so one bad URL never aborts the rest of the batch.
+    """
+    for attempt in range(_RETRIES + 1):
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.text
+        except _RETRYABLE_ERRORS as e:
+            if attempt == _RETRIES:
+                return e
+            await asyncio.sleep(_RETRY_BACKOFF * 2 ** attempt)
+        except Exception as e:
+            return e
+
+
+async def _scrape_many(
+    pending: List[Tuple[int, str]],
+    timeout: int = 10,
+    on_result: Optional[Callable[[int, Dict[str, any]], None]] = None
+) -> List[Tuple[int, Dict[str, any]]]:
+    """Scrape (index, url) pairs concurrently over a shared HTTP/2 client"""
+    limits = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+    
+    async with httpx.AsyncClient(
+        http2=True,
+        limits=limits,
+        timeout=timeout,
+        headers=_HEADERS,
+        follow_redirects=True
+    ) as client:
+        loop = asyncio.get_running_loop()
+        
+        async def scrape(index: int, url: str) -> Tuple[int, Dict[str, any]]:
+            page = await _fetch_html(client, url)
+            # Parsing is CPU-bound; run it in a worker thread so more
+            # responses can arrive in the meantime
+            result = await loop.run_in_executor(None, _scrape_prefetched, url, page, timeout)
+            if on_result is not None:
+                on_result(index, result)
+            return index, result
+        
+        return await asyncio.gather(*(scrape(index, url) for index, url in pending))
+
+
+def scrape_urls(
+    urls: List[str],
+    timeout: int = 10,
+    on_result: Optional[Callable[[int, Dict[str, any]], None]] = None
+) -> List[Dict[str, any]]:
+    """
+    Scrapes many URLs concurrently with an async HTTP/2 client.
+    
+    Intended for large batches, where multiplexed keep-alive connections
+    beat a thread pool of blocking requests. Pages already in the
+    scrape_url cache are served from it, and newly fetched pages are added
+    to it. Must be called from a thread without a running event loop
+    (e.g. the Streamlit script thread).
+    
+    Args:
+        urls: URLs to scrape
+        timeout: Request timeout in seconds
+        on_result: Optional callback invoked as on_result(index, result)
+            on the calling thread as each URL finishes
+        
+    Returns:
+        List of scrape_url-style result dictionaries, in input order
+    """
+    results = [None] * len(urls)
+    pending = []
+    
+    # Probe the cache: with nothing prefetched, misses raise _NotCached
+    _PREFETCHED.pages = {}
+    try:
+        for index, url in enumerate(urls):
+            try:
+                results[index] = scrape_url(url, timeout)
+            except _NotCached:
+                pending.append((index, url))
+                continue
+            if on_result is not None:
+                on_result(index, results[index])
+    finally:
+        _PREFETCHED.pages = None
+    
+    if pending:
+        for index, result in asyncio.run(_scrape_many(pending, timeout, on_result)):
+            results[index] = result
+    
+    return results
@@ -3,24 +3,303 @@ Content Quality Scoring Module
 Loads model and predicts content quality
 """
 
+import copy
+import hashlib
+import os
+import stat
+import threading
+from collections import namedtuple
 import joblib
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import streamlit as st
 from pathlib import Path
+from .forest import (
+    compile_forest_library,
+    generate_forest_source,
+    load_forest_library,
+    load_quantized_forest,
+    predict_quantized,
+    quantize_forest,
+    save_quantized_forest
+)
+
+
+# Model input columns, in training order
+FEATURE_NAMES = ['word_count', 'sentence_count', 'flesch_reading_ease', 'avg_word_length']
+
+# Model features unpacked from a feature dictionary, in FEATURE_NAMES order
+Features = namedtuple('Features', 'word_count sentence_count flesch avg_word_length')
+
+# Per-thread reusable input row for single-sample predictions
+_ROW_BUFFERS = threading.local()
+
+# Batches at least this large are predicted with all cores
+PARALLEL_PREDICT_THRESHOLD = 1024
+
+# Quality predictor, bound on first use (see _get_predictor)
+_PREDICTOR = None
+
+# Score colors: red (< 50), yellow (50-75), green (>= 75)
+_COLORS = np.array(['#dc3545', '#ffc107', '#28a745'])
+
+
+MODEL_PATH = Path(__file__).parent.parent / 'models' / 'quality_model.pkl'
+# Memory-mappable copy of the model written by convert_model.py
+FOREST_PATH = MODEL_PATH.with_name('quality_model_forest')
 
 
 @st.cache_resource
 def load_quality_model():
     """Load and cache the trained Random Forest model"""
-    model_path = Path(__file__).parent.parent / 'models' / 'quality_model.pkl'
+    model_path = MODEL_PATH
     try:
         model = joblib.load(model_path)
-        return model
     except FileNotFoundError:
         st.error(f"Model file not found at {model_path}")
         return None
+    
+    # The quantized forest is fed plain arrays in FEATURE_NAMES order; check
+    # the model was trained on the same columns
+    feature_names = getattr(model, 'feature_names_in_', None)
+    if feature_names is not None and list(feature_names) != FEATURE_NAMES:
+        st.error(f"Model expects features {list(feature_names)}, not {FEATURE_NAMES}")
+        return None
+    
+    return model
+
+
+def _to_features(features: Dict[str, any]) -> Features:
+    """Read the model features out of a feature dictionary (missing ones are 0)"""
+    return Features(
+        features.get('word_count', 0),
+        features.get('sentence_count', 0),
+        features.get('flesch_reading_ease', 0),
+        features.get('avg_word_length', 0)
+    )
+
+
+def _fill_feature_array(features_list: List[Dict[str, any]], out: np.ndarray) -> np.ndarray:
+    """Write feature dicts into a (n, 4) array in FEATURE_NAMES order"""
+    for i, features in enumerate(features_list):
+        out[i] = _to_features(features)
+    return out
+
+
+def _model_digest() -> str:
+    """Short hash of the model file, used to key derived artifacts"""
+    return hashlib.sha1(MODEL_PATH.read_bytes()).hexdigest()[:16]
+
+
+def quantize_quality_model(model) -> Dict[str, np.ndarray]:
+    """
+    Quantize the sklearn quality model into forest arrays tagged with the
+    model file digest (see convert_model.py).
+    """
+    forest = quantize_forest(model)
+    forest['digest'] = np.array(_model_digest())
+    return forest
+
+
+@st.cache_resource
+def load_quality_forest() -> Optional[Dict[str, np.ndarray]]:
+    """
+    Load and cache the quantized quality model as memory-mapped arrays.
+    
+    Mapping the arrays written by convert_model.py avoids unpickling the
+    forest into many small Python objects, and the read-only pages are
+    shared by every process serving the app. If the arrays are missing or
+    were built from a different model file, the pickled model is converted
+    in memory instead (and saved for next time where the disk is writable).
+    
+    Returns:
+        Quantized forest (see utils.forest), or None if no model is available
+    """
+    try:
+        forest = load_quantized_forest(FOREST_PATH)
+        if not MODEL_PATH.exists() or str(forest['digest']) == _model_digest():
+            return forest
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    model = load_quality_model()
+    
+    if model is None:
+        return None
+    
+    forest = quantize_quality_model(model)
+    
+    try:
+        save_quantized_forest(forest, FOREST_PATH)
+    except OSError:
+        # Read-only deployment: keep the in-memory copy
+        pass
+    
+    return forest
+
+
+def _check_private(path: Path) -> None:
+    """Raise PermissionError unless path is owned by this user and writable only by them"""
+    info = os.lstat(path)
+    if (
+        stat.S_ISLNK(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+    ):
+        raise PermissionError(f"Refusing to use {path}: not private to the current user")
+
+
+def _build_cache_dir() -> Path:
+    """
+    Per-user directory (mode 0700) for the compiled forest library.
+    
+    Whatever library sits there is loaded into the app process, so it must
+    not live anywhere other users can write, such as the shared temp dir.
+    """
+    path = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'seo_content_detector'
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    
+    if os.lstat(path).st_uid == os.getuid():
+        path.chmod(0o700)
+    _check_private(path)
+    
+    return path
+
+
+def _generated_c_predictor(forest: Dict[str, np.ndarray]) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Wrap the forest compiled from generated C as a predictor. The library is
+    cached in the private build directory, keyed by the generated source,
+    and only loaded if this user owns it.
+    """
+    source = generate_forest_source(forest)
+    digest = hashlib.sha1(source.encode()).hexdigest()[:16]
+    libpath = _build_cache_dir() / f"quality_forest_{digest}.so"
+    
+    if not libpath.exists():
+        compile_forest_library(source, libpath)
+    _check_private(libpath)
+    
+    return load_forest_library(forest, libpath)
+
+
+def _quantized_predictor(forest: Dict[str, np.ndarray]) -> Callable[[np.ndarray], np.ndarray]:
+    """Wrap the quantized, Numba-compiled forest as a predictor"""
+    # Compile both kernels now rather than on the first user request
+    warmup = np.zeros((1, len(FEATURE_NAMES)), dtype=np.float32)
+    predict_quantized(forest, warmup)
+    predict_quantized(forest, warmup, parallel=True)
+    
+    def predict(X: np.ndarray) -> np.ndarray:
+        return predict_quantized(forest, X, parallel=len(X) >= PARALLEL_PREDICT_THRESHOLD)
+    
+    return predict
+
+
+@st.cache_resource
+def load_quality_predictor() -> Optional[Callable[[np.ndarray], np.ndarray]]:
+    """
+    Build and cache the fastest available predictor for the quality model.
+    
+    Both backends work from the memory-mapped quantized forest, match
+    sklearn exactly and never unpickle the sklearn model: C code generated
+    from the trees and compiled with the system compiler or, without a
+    compiler, the uint8 node arrays walked by a Numba kernel.
+    
+    Returns:
+        Function mapping a float32 (n, 4) array to an array of quality
+        labels, or None if the model could not be loaded
+    """
+    forest = load_quality_forest()
+    
+    if forest is None:
+        return None
+    
+    try:
+        return _generated_c_predictor(forest)
+    except Exception:
+        # No usable C compiler
+        return _quantized_predictor(forest)
+
+
+def _get_predictor() -> Optional[Callable[[np.ndarray], np.ndarray]]:
+    """
+    Return the quality predictor, bound to a module global on first use so
+    the hot prediction paths skip the st.cache_resource lookup and lock.
+    """
+    global _PREDICTOR
+    if _PREDICTOR is None:
+        _PREDICTOR = load_quality_predictor()
+    return _PREDICTOR
+
+
+class _PredictorUnavailable(Exception):
+    """Raised when no quality model could be loaded (already reported by load_quality_model)"""
+
+
+def _report_prediction_error(error: Exception) -> None:
+    """Show a prediction failure in the app"""
+    if not isinstance(error, _PredictorUnavailable):
+        st.error(f"Prediction error: {error}")
+
+
+def predict_quality_batch(features_list: List[Dict[str, any]]) -> List[str]:
+    """
+    Predict content quality for many documents with one model call.
+    
+    Args:
+        features_list: List of feature dictionaries (see predict_quality)
+            
+    Returns:
+        List of quality labels, one per feature dictionary ('Unknown' for
+        all of them if prediction fails)
+    """
+    if not features_list:
+        return []
+    
+    try:
+        return _predict_batch_cached(features_list)
+    except Exception as e:
+        _report_prediction_error(e)
+        return ['Unknown'] * len(features_list)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _predict_batch_cached(features_list: List[Dict[str, any]]) -> List[str]:
+    """Predict labels for feature dictionaries; raises so failures are never cached"""
+    # Trees compare in float32, so build the input in that dtype directly
+    X = _fill_feature_array(
+        features_list,
+        np.empty((len(features_list), len(FEATURE_NAMES)), dtype=np.float32)
+    )
+    
+    return _predict_array(X).tolist()
+
+
+def _predict_array(X: np.ndarray) -> np.ndarray:
+    """Predict labels for a float32 (n, 4) array, raising if prediction fails"""
+    predictor = _get_predictor()
+    
+    if predictor is None:
+        raise _PredictorUnavailable()
+    if len(X) == 0:
+        return np.empty(0, dtype=object)
+    
+    return predictor(X)
+
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def _predict_cached(wc: int, sc: int, fre: float, awl: float) -> str:
+    """Predict the quality label for one set of features (cached per tuple; raises on failure)"""
+    # Plain ndarray input: no DataFrame construction or column alignment.
+    # Reuse this thread's input row instead of allocating one per call
+    row = getattr(_ROW_BUFFERS, 'row', None)
+    if row is None:
+        row = _ROW_BUFFERS.row = np.empty((1, len(FEATURE_NAMES)), dtype=np.float32)
+    row[0] = (wc, sc, fre, awl)
+    
+    return _predict_array(row)[0]
 
 
 def predict_quality(features: Dict[str, any]) -> str:
@@ -35,29 +314,55 @@ def predict_quality(features: Dict[str, any]) -> str:
             - avg_word_length
             
     Returns:
-        Quality label: 'Low', 'Medium', or 'High'
+        Quality label: 'Low', 'Medium', 'High', or 'Unknown' if prediction fails
     """
-    model = load_quality_model()
-    
-    if model is None:
-        return 'Unknown'
-    
-    # Prepare features in correct order
-    feature_vector = pd.DataFrame([{
-        'word_count': features.get('word_count', 0),
-        'sentence_count': features.get('sentence_count', 0),
-        'flesch_reading_ease': features.get('flesch_reading_ease', 0),
-        'avg_word_length': features.get('avg_word_length', 0)
-    }])
-    
+    return _predict_features(_to_features(features))
+
+
+def _predict_features(features: Features) -> str:
+    """Predict from Features, rounding floats so near-identical inputs share a cache entry"""
     try:
-        prediction = model.predict(feature_vector)[0]
-        return prediction
+        return _predict_cached(
+            int(features.word_count),
+            int(features.sentence_count),
+            round(float(features.flesch), 2),
+            round(float(features.avg_word_length), 2)
+        )
     except Exception as e:
-        st.error(f"Prediction error: {e}")
+        _report_prediction_error(e)
         return 'Unknown'
 
 
+# Static part of each interpretation; recommendations are filled in per call
+_INTERPRETATIONS = {
+    'High': {
+        'emoji': '🟢',
+        'message': 'Excellent content quality!',
+        'description': 'This content has strong indicators of high quality with good length and readability.',
+        'recommendations': []
+    },
+    'Medium': {
+        'emoji': '🟡',
+        'message': 'Good content, but room for improvement',
+        'description': 'This content meets basic quality standards but could be enhanced.',
+        'recommendations': []
+    },
+    'Low': {
+        'emoji': '🔴',
+        'message': 'Content needs significant improvement',
+        'description': 'This content falls short of quality standards.',
+        'recommendations': []
+    },
+    'Unknown': {
+        'emoji': '⚪',
+        'message': 'Unable to assess quality',
+        'description': 'Quality assessment unavailable.',
+        'recommendations': []
+    }
+}
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
 def get_quality_score_interpretation(quality: str, features: Dict[str, any]) -> Dict[str, str]:
     """
     Get interpretation and recommendations for quality score.
@@ -69,54 +374,33 @@ def get_quality_score_interpretation(quality: str, features: Dict[str, any]) ->
     Returns:
         Dictionary with interpretation and recommendations
     """
-    word_count = features.get('word_count', 0)
-    flesch = features.get('flesch_reading_ease', 0)
-    
-    interpretations = {
-        'High': {
-            'emoji': '🟢',
-            'message': 'Excellent content quality!',
-            'description': 'This content has strong indicators of high quality with good length and readability.',
-            'recommendations': []
-        },
-        'Medium': {
-            'emoji': '🟡',
-            'message': 'Good content, but room for improvement',
-            'description': 'This content meets basic quality standards but could be enhanced.',
-            'recommendations': []
-        },
-        'Low': {
-            'emoji': '🔴',
-            'message': 'Content needs significant improvement',
-            'description': 'This content falls short of quality standards.',
-            'recommendations': []
-        },
-        'Unknown': {
-            'emoji': '⚪',
-            'message': 'Unable to assess quality',
-            'description': 'Quality assessment unavailable.',
-            'recommendations': []
-        }
-    }
+    return _interpret(quality, _to_features(features))
+
+
+def _interpret(quality: str, features: Features) -> Dict[str, str]:
+    """Build the interpretation for a quality label (see get_quality_score_interpretation)"""
+    word_count, flesch = features.word_count, features.flesch
     
-    result = interpretations.get(quality, interpretations['Unknown']).copy()
+    result = copy.copy(_INTERPRETATIONS.get(quality, _INTERPRETATIONS['Unknown']))
     
     # Add specific recommendations
     recommendations = []
     
     if word_count < 500:
-        recommendations.append("📝 Increase content length (current: {0} words, recommended: 500+ words)".format(word_count))
+        recommendations.append(f"📝 Increase content length (current: {word_count} words, recommended: 500+ words)")
     elif word_count < 1500:
-        recommendations.append("📝 Consider expanding content (current: {0} words, optimal: 1500+ words)".format(word_count))
+        recommendations.append(f"📝 Consider expanding content (current: {word_count} words, optimal: 1500+ words)")
     
     if flesch < 30:
-        recommendations.append("📖 Simplify language for better readability (Flesch score: {0:.1f}/100)".format(flesch))
+        recommendations.append(f"📖 Simplify language for better readability (Flesch score: {flesch:.1f}/100)")
     elif flesch < 50:
-        recommendations.append("📖 Improve readability with simpler sentences (Flesch score: {0:.1f}/100)".format(flesch))
+        recommendations.append(f"📖 Improve readability with simpler sentences (Flesch score: {flesch:.1f}/100)")
     
     if quality == 'Low':
-        recommendations.append("✨ Review content structure and add more value")
-        recommendations.append("🎯 Focus on user intent and comprehensive coverage")
+        recommendations.extend((
+            "✨ Review content structure and add more value",
+            "🎯 Focus on user intent and comprehensive coverage"
+        ))
     
     result['recommendations'] = recommendations
     
@@ -137,6 +421,12 @@ def is_thin_content(word_count: int, threshold: int = 500) -> bool:
     return word_count < threshold
 
 
+def is_thin_content_vec(word_counts: np.ndarray, threshold: int = 500) -> np.ndarray:
+    """Vectorized is_thin_content: boolean mask of thin documents"""
+    return np.asarray(word_counts) < threshold
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
 def calculate_composite_score(features: Dict[str, any]) -> float:
     """
     Calculate a composite quality score (0-100).
@@ -147,10 +437,12 @@ def calculate_composite_score(features: Dict[str, any]) -> float:
     Returns:
         Score from 0 to 100
     """
-    word_count = features.get('word_count', 0)
-    sentence_count = features.get('sentence_count', 0)
-    flesch = features.get('flesch_reading_ease', 0)
-    avg_word_length = features.get('avg_word_length', 0)
+    return _composite_score(_to_features(features))
+
+
+def _composite_score(features: Features) -> float:
+    """Composite score from Features (see calculate_composite_score)"""
+    word_count, sentence_count, flesch, avg_word_length = features
     
     # Normalize components
     word_score = min(word_count / 2000, 1.0) * 30  # Max 30 points
@@ -163,11 +455,112 @@ def calculate_composite_score(features: Dict[str, any]) -> float:
     return min(total, 100)
 
 
+def calculate_composite_score_vec(
+    word_count: np.ndarray,
+    sentence_count: np.ndarray,
+    flesch: np.ndarray,
+    avg_word_length: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized calculate_composite_score over 1D feature arrays.
+    
+    Args:
+        word_count: Word counts
+        sentence_count: Sentence counts
+        flesch: Flesch reading ease scores
+        avg_word_length: Average word lengths
+        
+    Returns:
+        Array of scores from 0 to 100
+    """
+    total = (
+        np.minimum(word_count / 2000, 1.0) * 30
+        + np.clip(flesch, 0, 100) / 100 * 40
+        + np.minimum(sentence_count / 50, 1.0) * 20
+        + np.minimum(avg_word_length / 6, 1.0) * 10
+    )
+    
+    return np.minimum(total, 100.0)
+
+
 def get_score_color(score: float) -> str:
     """Get color for score visualization"""
-    if score >= 75:
-        return '#28a745'  # Green
-    elif score >= 50:
-        return '#ffc107'  # Yellow
-    else:
-        return '#dc3545'  # Red
+    return str(_COLORS[int(score >= 50) + int(score >= 75)])
+
+
+def get_score_color_vec(scores: np.ndarray) -> np.ndarray:
+    """Get colors for an array of scores (see get_score_color)"""
+    scores = np.asarray(scores)
+    return _COLORS[(scores >= 50).astype(int) + (scores >= 75).astype(int)].astype(object)
+
+
+def analyze(features: Dict[str, any]) -> Dict[str, any]:
+    """
+    Score one document in a single pass over its features.
+    
+    Reads the feature dictionary once and derives the quality label,
+    composite score, score color and interpretation from the same values,
+    instead of chaining predict_quality, calculate_composite_score and
+    get_quality_score_interpretation.
+    
+    Args:
+        features: Feature dictionary (see predict_quality)
+        
+    Returns:
+        Dictionary with:
+            - quality: Quality label
+            - score: Composite score from 0 to 100
+            - color: Score color for visualization
+            - interpretation: Interpretation and recommendations
+    """
+    values = _to_features(features)
+    
+    quality = _predict_features(values)
+    score = _composite_score(values)
+    
+    return {
+        'quality': quality,
+        'score': score,
+        'color': get_score_color(score),
+        'interpretation': _interpret(quality, values)
+    }
+
+
+def _predict_labels(X: np.ndarray) -> np.ndarray:
+    """_predict_array, with 'Unknown' for every row if prediction fails"""
+    try:
+        return _predict_array(X)
+    except Exception as e:
+        _report_prediction_error(e)
+        return np.full(len(X), 'Unknown', dtype=object)
+
+
+def build_results_frame(features_df: pd.DataFrame, urls: List[str]) -> pd.DataFrame:
+    """
+    Build the batch results table for many documents in one vectorized pass.
+    
+    Args:
+        features_df: DataFrame with FEATURE_NAMES columns, one row per document
+            (as returned by extract_basic_features_batch)
+        urls: Document URLs, in the same order as features_df
+        
+    Returns:
+        DataFrame with URL, Quality, Score, Word Count, Readability and
+        Thin Content columns, ready for st.dataframe
+    """
+    word_count = features_df['word_count'].to_numpy()
+    flesch = features_df['flesch_reading_ease'].to_numpy()
+    
+    return pd.DataFrame({
+        'URL': urls,
+        'Quality': _predict_labels(features_df[FEATURE_NAMES].to_numpy(dtype=np.float32)),
+        'Score': calculate_composite_score_vec(
+            word_count,
+            features_df['sentence_count'].to_numpy(),
+            flesch,
+            features_df['avg_word_length'].to_numpy()
+        ),
+        'Word Count': word_count,
+        'Readability': flesch,
+        'Thin Content': is_thin_content_vec(word_count)
+    })
@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import features
+from utils.features import (
+    _count_syllables,
+    extract_basic_features,
+    extract_basic_features_batch,
+    flesch_reading_ease
+)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+
+
+@pytest.fixture(scope='module')
+def pages():
+    return pd.read_csv(DATA_DIR / 'extracted_content.csv')['body_text'].fillna('').tolist()
+
+
+@pytest.fixture(params=[True, False], ids=['textstat', 'kernel'])
+def use_textstat(request, monkeypatch):
+    # The flag is not part of the cache keys, so start and end with empty caches
+    monkeypatch.setattr(features, 'USE_TEXTSTAT_FLESCH', request.param)
+    extract_basic_features.clear()
+    extract_basic_features_batch.clear()
+    yield request.param
+    extract_basic_features.clear()
+    extract_basic_features_batch.clear()
+
+
+def test_flesch_defaults_to_textstat():
+    # The quality model was trained on textstat's Flesch scores
+    assert features.USE_TEXTSTAT_FLESCH
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('', 0),
+    ('cat', 1),
+    ('cake', 1),
+    ('water', 2),
+    ('reading', 2),
+    ('beautiful', 3),
+    ('queue', 1),
+    ('rhythm', 1),
+    ("don't", 1),
+    ('the cat sat', 3),
+    ('hello, world!', 3),
+])
+def test_count_syllables(text, expected):
+    assert _count_syllables(np.frombuffer(text.encode(), dtype=np.uint8)) == expected
+
+
+def test_kernel_flesch_formula(monkeypatch):
+    monkeypatch.setattr(features, 'USE_TEXTSTAT_FLESCH', False)
+    text = 'the cat sat on the mat. the water was beautiful.'
+    
+    # 10 words, 2 sentences, 13 syllables
+    expected = round(206.835 - 1.015 * (10 / 2) - 84.6 * (13 / 10), 2)
+    assert flesch_reading_ease(text, 10, 2) == pytest.approx(expected)
+    assert flesch_reading_ease('', 0, 0) == 0.0
+
+
+def test_batch_features_match_single(pages, use_textstat):
+    texts = [
+        '',
+        '   ',
+        'Too short.',
+        'Just nine words here. Still under the minimum, ok',
+        'Exactly ten words are in this text, right at minimum!',
+        "It's a longer text. Does it work? Yes... it does! Numbers like 3.14 stay in one sentence.",
+    ] + pages
+    
+    batch = extract_basic_features_batch(texts).to_dict('records')
+    
+    assert len(batch) == len(texts)
+    for text, row in zip(texts, batch):
+        single = extract_basic_features(text)
+        assert row['word_count'] == single['word_count']
+        assert row['sentence_count'] == single['sentence_count']
+        assert row['flesch_reading_ease'] == pytest.approx(single['flesch_reading_ease'])
+        assert row['avg_word_length'] == pytest.approx(single['avg_word_length'])
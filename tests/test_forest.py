@@ -0,0 +1,93 @@
+import hashlib
+import os
+import shutil
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.forest import (
+    compile_forest_library,
+    generate_forest_source,
+    load_forest_library,
+    load_quantized_forest,
+    predict_quantized,
+    quantize_forest
+)
+from utils.scorer import FEATURE_NAMES, FOREST_PATH, MODEL_PATH
+
+
+@pytest.fixture(scope='module')
+def model():
+    with warnings.catch_warnings():
+        # The pickle may come from a newer scikit-learn than the installed one
+        warnings.simplefilter('ignore')
+        return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope='module')
+def forest(model):
+    return quantize_forest(model)
+
+
+@pytest.fixture(scope='module', params=['random', 'thresholds'])
+def X(request, forest):
+    rng = np.random.default_rng(0)
+    n = 5000
+    X = np.column_stack([
+        rng.integers(0, 6000, n),
+        rng.integers(0, 300, n),
+        rng.uniform(-50, 120, n),
+        rng.uniform(2, 9, n)
+    ]).astype(np.float32)
+    
+    if request.param == 'thresholds':
+        # Put one feature exactly on (and one float32 step either side of)
+        # every threshold of the forest, the cases where rounding would bite
+        rows = []
+        for f in range(X.shape[1]):
+            edges = forest['bin_edges'][f, :forest['n_edges'][f]].astype(np.float32)
+            for values in (edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf)):
+                block = X[:len(values)].copy()
+                block[:, f] = values
+                rows.append(block)
+        X = np.concatenate(rows)
+    
+    return X
+
+
+@pytest.fixture(scope='module')
+def expected(model, X):
+    return model.predict(pd.DataFrame(X, columns=FEATURE_NAMES))
+
+
+def test_quantized_matches_sklearn(forest, X, expected):
+    np.testing.assert_array_equal(predict_quantized(forest, X), expected)
+
+
+def test_quantized_parallel_matches_sklearn(forest, X, expected):
+    np.testing.assert_array_equal(predict_quantized(forest, X, parallel=True), expected)
+
+
+@pytest.mark.skipif(shutil.which(os.environ.get('CC', 'cc')) is None, reason="no C compiler")
+def test_generated_c_matches_sklearn(forest, X, expected, tmp_path):
+    libpath = tmp_path / 'forest.so'
+    compile_forest_library(generate_forest_source(forest), libpath)
+    predict = load_forest_library(forest, libpath)
+    
+    np.testing.assert_array_equal(predict(X), expected)
+
+
+def test_committed_forest_is_current(forest):
+    committed = load_quantized_forest(FOREST_PATH)
+    
+    # Built from the committed model file ...
+    assert str(committed['digest']) == hashlib.sha1(MODEL_PATH.read_bytes()).hexdigest()[:16]
+    
+    # ... by the current quantize_forest (rerun convert_model.py if not)
+    assert set(committed) == set(forest) | {'digest'}
+    for name, array in forest.items():
+        assert committed[name].dtype == array.dtype, name
+        np.testing.assert_array_equal(committed[name], array, err_msg=name)
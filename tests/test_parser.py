@@ -0,0 +1,117 @@
+import http.server
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from utils import parser
+from utils.parser import scrape_url, scrape_urls
+
+PAGE = '<html><title>{}</title><body><main>' + 'word ' * 50 + 'page.</main></body></html>'
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Serves a page per path; /flaky* fails once, /drop* disconnects once"""
+
+    def do_GET(self):
+        hits = self.server.hits
+        hits[self.path] += 1
+        
+        if self.path.startswith('/drop') and hits[self.path] == 1:
+            self.close_connection = True
+            return
+        if self.path.startswith('/flaky') and hits[self.path] == 1:
+            self.send_response(503)
+            body = b'unavailable'
+        else:
+            self.send_response(200)
+            body = PAGE.format(self.path).encode()
+        
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.hits = Counter()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(parser, '_RETRY_BACKOFF', 0)
+    parser._fetch_page.clear()
+    yield
+    parser._fetch_page.clear()
+
+
+def url_for(server, path):
+    return f'http://127.0.0.1:{server.server_address[1]}{path}'
+
+
+def test_cache_hit_skips_network(server):
+    url = url_for(server, '/hit')
+    
+    assert scrape_url(url)['status'] == 'success'
+    results = scrape_urls([url])
+    
+    assert results[0]['status'] == 'success'
+    assert results[0]['title'] == '/hit'
+    assert server.hits['/hit'] == 1
+
+
+def test_miss_is_fetched_then_cached(server):
+    url = url_for(server, '/miss')
+    
+    first = scrape_urls([url])
+    assert first[0]['status'] == 'success'
+    assert first[0]['word_count'] == 51
+    
+    assert scrape_urls([url]) == first
+    assert scrape_url(url) == first[0]
+    assert server.hits['/miss'] == 1
+
+
+def test_failure_is_not_cached(server):
+    url = url_for(server, '/flaky')
+    
+    assert scrape_urls([url])[0]['status'] == 'error'
+    assert scrape_urls([url])[0]['status'] == 'success'
+    assert server.hits['/flaky'] == 2
+
+
+def test_dropped_connection_is_retried(server):
+    url = url_for(server, '/drop')
+    
+    assert scrape_urls([url])[0]['status'] == 'success'
+    assert server.hits['/drop'] == 2
+
+
+def test_bad_urls_become_error_rows(server, monkeypatch):
+    # Errors that cannot succeed on retry must not wait for the backoff
+    monkeypatch.setattr(parser, '_RETRY_BACKOFF', 5)
+    good = url_for(server, '/good')
+    urls = [float('nan'), 'http://a\x00b.com', 'example.com', good]
+    
+    start = time.monotonic()
+    results = scrape_urls(urls)
+    
+    assert time.monotonic() - start < 2
+    assert [r['status'] for r in results] == ['error', 'error', 'error', 'success']
+    assert results[1]['url'] == urls[1]
+    assert all(r['error'] for r in results[:3])
+    assert server.hits['/good'] == 1
+    
+    # The blocking path turns the same inputs into error rows too
+    for url in urls[:3]:
+        assert scrape_url(url)['status'] == 'error'